@@ -6,6 +6,9 @@ class PostgresSchemaConfig(AppConfig):
 
     def ready(self):
         from django.conf import settings
+        from django.core.signals import request_finished
+        from .models import deactivate_request_schema
+        request_finished.connect(deactivate_request_schema)
         for key in dir(DefaultSettings):
             if not hasattr(settings, key):
                 setattr(settings, key,
@@ -15,5 +18,13 @@ class PostgresSchemaConfig(AppConfig):
 class DefaultSettings:
     POSTGRES_PUBLIC_SCHEMA = 'public'
     POSTGRES_TEMPLATE_SCHEMA = '__template__'
+    POSTGRES_POOLED_SCHEMA = '__pooled__'
     POSTGRES_SCHEMA_MODEL = None
     POSTGRES_SCHEMA_TENANTS = []
+    POSTGRES_SCHEMA_REGISTRY = False
+    POSTGRES_SCHEMA_REGISTRY_CHANNEL = 'postgres_schema'
+    POSTGRES_SCHEMA_REGISTRY_POLL_INTERVAL = 60
+    POSTGRES_SCHEMA_APPLICATION_NAME = None
+    POSTGRES_SCHEMA_QUERY_STATS = False
+    POSTGRES_SCHEMA_RETENTION_DAYS = 30
+    POSTGRES_SCHEMA_TEST_TENANTS = []
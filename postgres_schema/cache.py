@@ -0,0 +1,126 @@
+import time
+from collections import Counter, defaultdict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+
+def active_schema_name():
+    from .models import AbstractSchema
+    schema = AbstractSchema.active()
+    if schema is None:
+        return settings.POSTGRES_PUBLIC_SCHEMA
+    return schema.schema
+
+
+def make_key(key, key_prefix, version):
+    """
+    Cache key function prefixing every key with the active schema.
+
+    Use it as the ``KEY_FUNCTION`` of a cache so that code unaware of tenants
+    can not read or overwrite the data of another tenant.
+    """
+    return '%s:%s:%s:%s' % (key_prefix, version, active_schema_name(), key)
+
+
+class TenantCache:
+    """
+    Caches values under the active schema.
+
+    Keys are prefixed with the schema name and a generation which is stored
+    in the cache itself, so all data cached for a tenant is invalidated at
+    once by bumping its generation. Hits and misses are counted per schema.
+    """
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+        self._lock = Lock()
+        self._stats = defaultdict(Counter)
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def generation_key(self, schema_name):
+        return 'postgres_schema:%s:generation' % schema_name
+
+    def generation(self, schema_name):
+        key = self.generation_key(schema_name)
+        generation = self.cache.get(key)
+        if generation is None:
+            # Start from the clock rather than 1, so an evicted generation can
+            # not bring back entries cached under an earlier one.
+            self.cache.add(key, int(time.time() * 1000), None)
+            generation = self.cache.get(key)
+        return generation
+
+    def make_key(self, key, schema_name=None):
+        schema_name = schema_name or active_schema_name()
+        return '%s:%s:%s' % (schema_name, self.generation(schema_name), key)
+
+    def get(self, key, default=None):
+        schema_name = active_schema_name()
+        value = self.cache.get(self.make_key(key, schema_name), self)
+        self._record(schema_name, value is not self)
+        return default if value is self else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self.cache.set(self.make_key(key), value, timeout)
+
+    def delete(self, key):
+        self.cache.delete(self.make_key(key))
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT):
+        """
+        Returns the cached value of ``key``, storing ``default`` (or the
+        result of calling it) when there is none.
+        """
+        schema_name = active_schema_name()
+        key = self.make_key(key, schema_name)
+        value = self.cache.get(key, self)
+        self._record(schema_name, value is not self)
+        if value is self:
+            value = default() if callable(default) else default
+            self.cache.set(key, value, timeout)
+        return value
+
+    def get_queryset(self, key, queryset, timeout=DEFAULT_TIMEOUT):
+        """
+        Returns the results of ``queryset`` as a list, cached for the active
+        schema.
+        """
+        return self.get_or_set(key, lambda: list(queryset), timeout)
+
+    def invalidate(self, schema_name=None):
+        """
+        Invalidates everything cached for ``schema_name``, which defaults to
+        the active schema.
+        """
+        key = self.generation_key(schema_name or active_schema_name())
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, int(time.time() * 1000), None)
+
+    def _record(self, schema_name, hit):
+        with self._lock:
+            self._stats[schema_name]['hits' if hit else 'misses'] += 1
+
+    def stats(self):
+        """
+        Returns the hit and miss counts of this process by schema name.
+        """
+        with self._lock:
+            return {
+                schema_name: {'hits': counts['hits'], 'misses': counts['misses']}
+                for schema_name, counts in self._stats.items()
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+tenant_cache = TenantCache()
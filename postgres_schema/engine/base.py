@@ -1,6 +1,28 @@
 from django.db.backends.postgresql import base
 from postgres_schema.schema import DatabaseSchemaEditor
 
+from .stats import query_stats
+
 
 class DatabaseWrapper(base.DatabaseWrapper):
     SchemaEditorClass = DatabaseSchemaEditor
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.schema_name = None
+        self.tenant_name = None
+        self.schema_parameters = set()
+        self.schema_slot = None
+        # Execute wrappers only exist since Django 2.0, query stats are not
+        # collected on earlier versions.
+        if hasattr(self, 'execute_wrappers'):
+            self.execute_wrappers.append(query_stats)
+
+    def init_connection_state(self):
+        super().init_connection_state()
+        # A new connection starts with the default search_path and settings,
+        # and holds no advisory locks.
+        self.schema_name = None
+        self.tenant_name = None
+        self.schema_parameters = set()
+        self.schema_slot = None
@@ -0,0 +1,53 @@
+import time
+from collections import defaultdict
+from threading import Lock
+
+from django.conf import settings
+
+
+class QueryStats:
+    """
+    Execute wrapper counting the queries and the time spent in them for
+    each schema, within this process.
+
+    The schema of a query is the one last activated on its connection, or
+    the tenant for tenants in the pooled schema.
+    Counting is enabled with ``POSTGRES_SCHEMA_QUERY_STATS``.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._stats = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        if not settings.POSTGRES_SCHEMA_QUERY_STATS:
+            return execute(sql, params, many, context)
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.monotonic() - start
+            schema_name = getattr(context['connection'], 'tenant_name', None) or settings.POSTGRES_PUBLIC_SCHEMA
+            with self._lock:
+                stats = self._stats[schema_name]
+                stats[0] += 1
+                stats[1] += duration
+
+    def report(self, limit=None):
+        """
+        Returns ``(schema_name, queries, seconds)`` tuples, the schemas which
+        spent the most time in queries first.
+        """
+        with self._lock:
+            report = sorted(
+                ((schema_name, count, total) for schema_name, (count, total) in self._stats.items()),
+                key=lambda row: row[2], reverse=True,
+            )
+        return report[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+query_stats = QueryStats()
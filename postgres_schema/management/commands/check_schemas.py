@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from postgres_schema.models import get_schema_model
+from postgres_schema.schema import get_schema_fingerprints, get_schema_structure
+
+
+class Command(BaseCommand):
+    help = "Compares the structure of tenant schemas with the template schema."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'schemas', nargs='*',
+            help='Schemas to check, defaults to all schemas.',
+        )
+
+    def handle(self, *args, **options):
+        schema_names = options['schemas'] or get_schema_model().objects.schema_names()
+        template = settings.POSTGRES_TEMPLATE_SCHEMA
+
+        fingerprints = get_schema_fingerprints([template] + schema_names)
+        expected = fingerprints.get(template)
+        drifted = [name for name in schema_names if fingerprints.get(name) != expected]
+
+        if drifted:
+            template_structure = set(get_schema_structure(template))
+            for schema_name in drifted:
+                structure = set(get_schema_structure(schema_name))
+                self.stdout.write('%s differs from %s:\n' % (schema_name, template))
+                for item in sorted(template_structure - structure):
+                    self.stdout.write('  - %s\n' % item)
+                for item in sorted(structure - template_structure):
+                    self.stdout.write('  + %s\n' % item)
+
+        if options['verbosity'] >= 1:
+            self.stdout.write('%d of %d schemas match %s.\n' % (
+                len(schema_names) - len(drifted), len(schema_names), template,
+            ))
+
+        if drifted:
+            raise CommandError('%d schemas differ from %s.' % (len(drifted), template))
@@ -1,10 +1,12 @@
 import os
+import time
 from collections import OrderedDict
 from django.apps import apps
 from django.conf import settings
 from django.core.management.commands.migrate import Command as MigrateCommand
 from django.db import router, transaction
 
+from postgres_schema.registry import notify_trigger_sql
 from postgres_schema.schema import activate_schema, deactivate_schema, is_tenant_model
 
 
@@ -49,44 +51,42 @@ class Command(MigrateCommand):
             if self.verbosity >= 1:
                 self.stdout.write("  Creating tables...\n")
 
+            start = time.time()
+
             with transaction.atomic(using=connection.alias, savepoint=connection.features.can_rollback_ddl):
 
+                # A single editor creates every model; its deferred SQL is
+                # collected per schema and executed once when the editor exits.
                 with connection.schema_editor() as editor:
                     editor.execute("CREATE SCHEMA {}".format(settings.POSTGRES_TEMPLATE_SCHEMA))
                     statements = editor.connection.ops.prepare_sql_script(CLONE_SCHEMA)
                     for statement in statements:
                         editor.execute(statement, params=None)
 
-                schema_deferred_sql = {}
-
-                with connection.schema_editor() as editor:
                     schema_model = apps.get_model(settings.POSTGRES_SCHEMA_MODEL)
                     editor.create_model(schema_model, verbosity=self.verbosity)
-                    schema_deferred_sql.update(editor.schema_deferred_sql)
-                    editor.schema_deferred_sql = {}
+                    for statement in notify_trigger_sql(schema_model, editor.quote_name):
+                        editor.execute(statement, params=None)
                     created_models.add(schema_model)
 
-                for app_name, model_list in manifest.items():
-                    for model in model_list:
-                        if not model._meta.can_migrate(connection):
-                            continue
-                        if model in created_models:
-                            continue  # probably schema model
-                        if self.verbosity >= 3:
-                            self.stdout.write(
-                                "    Processing %s.%s model\n" % (app_name, model._meta.object_name)
-                            )
-                        with connection.schema_editor() as editor:
-                            editor.schema_deferred_sql.update(schema_deferred_sql)
+                    for app_name, model_list in manifest.items():
+                        for model in model_list:
+                            if not model._meta.can_migrate(connection):
+                                continue
+                            if model in created_models:
+                                continue  # probably schema model
+                            if self.verbosity >= 3:
+                                self.stdout.write(
+                                    "    Processing %s.%s model\n" % (app_name, model._meta.object_name)
+                                )
                             editor.create_model(model, verbosity=self.verbosity)
-                            schema_deferred_sql.update(editor.schema_deferred_sql)
-                            editor.schema_deferred_sql = {}
                             created_models.add(model)
 
-                if self.verbosity >= 1:
-                    self.stdout.write("\n    Running deferred SQL...\n")
-                with connection.schema_editor() as editor:
-                    editor.schema_deferred_sql = schema_deferred_sql
+                    if self.verbosity >= 1:
+                        self.stdout.write("\n    Running deferred SQL...\n")
+
+            if self.verbosity >= 1:
+                self.stdout.write("  Created %d models in %.2fs\n" % (len(created_models), time.time() - start))
 
         finally:
             cursor.close()
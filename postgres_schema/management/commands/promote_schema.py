@@ -0,0 +1,39 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from postgres_schema.models import get_schema_model
+from postgres_schema.schema import check_pooled_tables, create_schema, move_pooled_rows, schema_exists
+
+
+class Command(BaseCommand):
+    help = "Moves pooled tenants out of the pooled schema into schemas of their own."
+
+    def add_arguments(self, parser):
+        parser.add_argument('schemas', nargs='+', help='Pooled tenants to promote.')
+
+    def handle(self, *args, **options):
+        Schema = get_schema_model()
+        try:
+            check_pooled_tables()
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        for schema_name in options['schemas']:
+            try:
+                schema = Schema.objects.get(schema=schema_name, is_pooled=True)
+            except Schema.DoesNotExist:
+                raise CommandError('%s is not a pooled tenant.' % schema_name)
+            if schema_exists(schema_name):
+                raise CommandError('Schema %s already in use.' % schema_name)
+
+            with transaction.atomic():
+                # Saving or purging the tenant waits until it has been moved.
+                if not Schema.objects.select_for_update().filter(pk=schema.pk, is_pooled=True).exists():
+                    raise CommandError('%s is not a pooled tenant.' % schema_name)
+                create_schema(schema_name)
+                move_pooled_rows(schema_name)
+                # Saving the schema refuses to change is_pooled on its own.
+                Schema.objects.filter(pk=schema.pk).update(is_pooled=False)
+
+            if options['verbosity'] >= 1:
+                self.stdout.write('Promoted %s.\n' % schema_name)
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from postgres_schema.purge import SchemaPurge, backfill_deactivated_at, purgeable_schemas
+
+
+class Command(BaseCommand):
+    help = "Drops schemas which have been inactive for longer than the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days', type=int, default=settings.POSTGRES_SCHEMA_RETENTION_DAYS,
+            help='Only purge schemas deactivated at least this many days ago.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=10,
+            help='Number of tables dropped per transaction.',
+        )
+        parser.add_argument(
+            '--max-lag', type=int, default=None,
+            help='Wait for standbys to be less than this many WAL bytes behind before each batch.',
+        )
+        parser.add_argument(
+            '--time-budget', type=float, default=None,
+            help='Stop starting new batches after this many seconds.',
+        )
+        parser.add_argument(
+            '--lock-timeout', default='5s',
+            help='Skip a schema when a batch waits longer than this for its locks.',
+        )
+        parser.add_argument(
+            '--archive-dir', default=None,
+            help='Copy every table to a gzipped CSV file in this directory before dropping it.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only list the schemas which would be purged.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['dry_run']:
+            backfilled = backfill_deactivated_at()
+            if backfilled and options['verbosity'] >= 1:
+                self.stdout.write('Started the retention period of %d schemas.\n' % backfilled)
+
+        schemas = purgeable_schemas(options['retention_days'])
+
+        if options['dry_run']:
+            for schema in schemas:
+                self.stdout.write('%s (deactivated %s)\n' % (schema.schema, schema.deactivated_at))
+            return
+
+        purge = SchemaPurge(
+            batch_size=options['batch_size'],
+            max_lag=options['max_lag'],
+            time_budget=options['time_budget'],
+            archive_dir=options['archive_dir'],
+            lock_timeout=options['lock_timeout'],
+            stdout=self.stdout if options['verbosity'] >= 1 else None,
+        )
+        purged = purge.run(schemas)
+        if options['verbosity'] >= 1:
+            self.stdout.write('Purged %d schemas.\n' % len(purged))
@@ -3,15 +3,19 @@ from threading import local
 from django.apps import apps as django_apps
 from django.conf import settings
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import connection, models, transaction
 from django.db.models import query, manager
+from django.db.utils import DatabaseError
 from django.forms import ValidationError
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django.core.exceptions import ImproperlyConfigured
 
+from .registry import schema_registry
 from .schema import (
-    create_schema, schema_exists,
+    create_schema, schema_exists, check_pooled_tables,
     activate_schema, deactivate_schema,
+    ConcurrencyLimitExceeded,
 )
 
 
@@ -38,11 +42,57 @@ class SchemaQuerySet(models.query.QuerySet):
         return self.filter(is_active=False)
 
     def delete(self):
-        self.update(is_active=False)
+        self.active().update(is_active=False, deactivated_at=timezone.now())
 
     def activate(self, pk):
         self.get(pk=pk).activate()
 
+    def schema_names(self):
+        """
+        Returns the names of the Postgres schemas holding the data of these
+        tenants, and the pooled schema whenever it exists, so that it keeps
+        being migrated while no tenant is pooled.
+        """
+        schema_names = list(self.filter(is_pooled=False).values_list('schema', flat=True))
+        if schema_exists(settings.POSTGRES_POOLED_SCHEMA):
+            schema_names.append(settings.POSTGRES_POOLED_SCHEMA)
+        return schema_names
+
+
+class SchemaBaseManager(manager.BaseManager):
+    """
+    Looks tenants up from the schema registry without a query when it is
+    enabled. These lookups ignore queryset filters, so they are only
+    available on the manager.
+    """
+
+    def resolve(self, schema):
+        """
+        Returns the schema named ``schema``.
+        """
+        if schema_registry.enabled:
+            instance = schema_registry.get(schema)
+            if instance is None:
+                raise self.model.DoesNotExist('Schema %s does not exist.' % schema)
+            return instance
+        return self.get(pk=schema)
+
+    def get_active(self, schema):
+        """
+        Returns the schema named ``schema`` if it is active.
+        """
+        instance = self.resolve(schema)
+        if not instance.is_active:
+            raise self.model.DoesNotExist('Schema %s is not active.' % schema)
+        return instance
+
+    def activate(self, pk):
+        self.resolve(pk).activate()
+
+
+class SchemaManager(SchemaBaseManager.from_queryset(SchemaQuerySet)):
+    pass
+
 
 _active = local()
 
@@ -81,7 +131,31 @@ class AbstractSchema(models.Model):
         help_text=_('Use this instead of deleting schema.')
     )
 
-    objects = SchemaQuerySet.as_manager()
+    is_pooled = models.BooleanField(default=False,
+        help_text=_('Keep the data in the shared pooled schema instead of a dedicated one.')
+    )
+
+    deactivated_at = models.DateTimeField(null=True, blank=True, editable=False,
+        help_text=_('When the schema was deactivated, inactive schemas are purged after a retention period.')
+    )
+
+    statement_timeout = models.PositiveIntegerField(null=True, blank=True,
+        help_text=_('Abort statements running longer than this many milliseconds.')
+    )
+
+    work_mem = models.CharField(max_length=16, blank=True,
+        validators=[RegexValidator(
+            regex='^[0-9]+(kB|MB|GB)?$',
+            message=_('Must be a number of kilobytes or have a kB, MB or GB unit.')
+        )],
+        help_text=_('Memory used by query operations before writing to temporary files, e.g. 64MB.')
+    )
+
+    max_concurrency = models.PositiveSmallIntegerField(null=True, blank=True,
+        help_text=_('Maximum number of connections using the schema at the same time.')
+    )
+
+    objects = SchemaManager()
 
     class Meta:
         abstract = True
@@ -89,18 +163,23 @@ class AbstractSchema(models.Model):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._initial_schema = self.schema
+        self._initial_is_pooled = self.is_pooled
 
     def __repr__(self):
         return '%s (%s)' % (self.name, self.schema)
 
     def save(self, *args, **kwargs):
 
-        if self.schema in (settings.POSTGRES_PUBLIC_SCHEMA, settings.POSTGRES_TEMPLATE_SCHEMA):
+        if self.schema in (settings.POSTGRES_PUBLIC_SCHEMA, settings.POSTGRES_TEMPLATE_SCHEMA,
+                           settings.POSTGRES_POOLED_SCHEMA):
             raise ValidationError(_('Schema %s is not editable') % self.schema)
 
         self._meta.get_field('schema').run_validators(self.schema)
 
         if self._state.adding:
+            if self.is_pooled:
+                # Tables without a tenant column would be shared by all pooled tenants.
+                check_pooled_tables()
             if self.schema_exists():
                 raise ValidationError(_('Schema %s already in use') % self.schema)
             else:
@@ -109,20 +188,60 @@ class AbstractSchema(models.Model):
         elif self.schema != self._initial_schema:
             raise ValidationError(_('may not change schema after creation.'))
 
-        return super().save(*args, **kwargs)
+        elif self.is_pooled != self._initial_is_pooled:
+            raise ValidationError(_('may only be moved out of the pooled schema with promote_schema.'))
+
+        if self.is_active:
+            self.deactivated_at = None
+        elif self.deactivated_at is None:
+            self.deactivated_at = timezone.now()
+
+        result = super().save(*args, **kwargs)
+        if schema_registry.enabled:
+            transaction.on_commit(lambda: schema_registry.set(self))
+        return result
 
     def delete(self, using=None, keep_parents=False):
         self.is_active = False
         self.save()
 
+    @property
+    def schema_name(self):
+        """
+        The name of the Postgres schema holding the data of this tenant.
+        """
+        if self.is_pooled:
+            return settings.POSTGRES_POOLED_SCHEMA
+        return self.schema
+
     def create_schema(self):
-        create_schema(self.schema)
+        # Cloning the template is skipped when the pooled schema exists.
+        create_schema(self.schema_name)
 
     def schema_exists(self):
+        # The registry only learns about schemas created outside of the schema
+        # model on its next reload, so names it does not know are looked up.
+        if schema_registry.enabled and schema_registry.exists(self.schema):
+            return True
         return schema_exists(self.schema)
 
+    def get_parameters(self):
+        """
+        Returns the run-time settings applied when the schema is activated.
+        """
+        return {
+            'statement_timeout': self.statement_timeout,
+            'work_mem': self.work_mem or None,
+        }
+
     def activate(self):
-        activate_schema(self.schema)
+        try:
+            activate_schema(self.schema_name, parameters=self.get_parameters(),
+                            concurrency=self.max_concurrency, tenant=self.schema)
+        except ConcurrencyLimitExceeded:
+            # The public schema has been activated instead.
+            _active.schema = None
+            raise
         _active.schema = self
 
     @staticmethod
@@ -135,6 +254,28 @@ class AbstractSchema(models.Model):
         return getattr(_active, "schema", None)
 
 
+def deactivate_request_schema(**kwargs):
+    """
+    Deactivates the schema a request left active.
+
+    Connected to ``request_finished``, so that the next request on the same
+    persistent connection neither runs as the tenant nor holds its
+    concurrency slot.
+    """
+    _active.schema = None
+    if connection.connection is None:
+        return  # closed, a new connection starts in the public schema
+    if (getattr(connection, 'schema_name', None) in (None, settings.POSTGRES_PUBLIC_SCHEMA) and
+            not getattr(connection, 'schema_parameters', None) and
+            getattr(connection, 'schema_slot', None) is None):
+        return
+    try:
+        deactivate_schema()
+    except DatabaseError:
+        # The connection can not be used, closing it releases the lock.
+        connection.close()
+
+
 class SchemaAwareModel(models.Model):
     class Meta:
         abstract = True
@@ -155,3 +296,42 @@ class SchemaAwareBaseManager(manager.BaseManager):
 
 class SchemaAwareManager(SchemaAwareBaseManager.from_queryset(query.QuerySet)):
     pass
+
+
+def active_tenant():
+    """
+    Returns the schema of the active tenant, the default of the tenant column.
+    """
+    schema = AbstractSchema.active()
+    return schema.schema if schema is not None else ''
+
+
+class PooledTenantBaseManager(manager.BaseManager):
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        schema = AbstractSchema.active()
+        if schema is not None and schema.is_pooled:
+            queryset = queryset.filter(tenant=schema.schema)
+        return queryset
+
+
+class PooledTenantManager(PooledTenantBaseManager.from_queryset(query.QuerySet)):
+    pass
+
+
+class PooledTenantModel(models.Model):
+    """
+    Base for tenant models which may be stored in the pooled schema, where
+    the rows of all pooled tenants are told apart by the tenant column.
+
+    Pooled tenants can only be created while every tenant model derives from
+    it, many to many fields need a through model derived from it as well.
+    Unique fields are unique across all pooled tenants, not per tenant.
+    """
+
+    tenant = models.CharField(max_length=36, db_index=True, editable=False, default=active_tenant)
+
+    objects = PooledTenantManager()
+
+    class Meta:
+        abstract = True
@@ -1,6 +1,9 @@
 import sys
 from django.conf import settings
+from django.db.migrations.operations.base import Operation
 from .models import get_schema_model
+from .schema import schema_exists
+from .registry import notify_trigger_sql, drop_notify_trigger_sql
 
 Schema = get_schema_model()
 
@@ -15,6 +18,7 @@ class RunInSchemas:
         self.operation = operation
         self.public = public
         self.template = template
+        self.all_schemas = schemas is ALL_SCHEMAS
         if schemas is ALL_SCHEMAS:
             self.schemas = Schema.objects.all()
         else:
@@ -38,10 +42,25 @@ class RunInSchemas:
             schema_editor.activate_schema(settings.POSTGRES_TEMPLATE_SCHEMA)
             method(app_label, schema_editor, from_state, to_state)
 
+        schema_names = set()
         for schema in self.schemas:
+            # Pooled tenants share a schema, the operation runs in it only once.
+            if schema.schema_name in schema_names:
+                continue
+            schema_names.add(schema.schema_name)
             schema_editor.activate_schema(schema)
             sys.stdout.write(' ')
-            sys.stdout.write(schema.schema)
+            sys.stdout.write(schema.schema_name)
+            sys.stdout.flush()
+            method(app_label, schema_editor, from_state, to_state)
+
+        # The pooled schema is migrated along with the template, also while
+        # no tenant is pooled, so that it does not drift from it.
+        pooled = settings.POSTGRES_POOLED_SCHEMA
+        if self.all_schemas and pooled not in schema_names and schema_exists(pooled):
+            schema_editor.activate_schema(pooled)
+            sys.stdout.write(' ')
+            sys.stdout.write(pooled)
             sys.stdout.flush()
             method(app_label, schema_editor, from_state, to_state)
 
@@ -69,3 +88,30 @@ class RunInPublic(RunInSchemas):
 class RunInTemplate(RunInSchemas):
     def __init__(self, operation):
         super().__init__(operation, schemas=[], template=True)
+
+
+class InstallSchemaNotifyTrigger(Operation):
+    """
+    Installs the trigger on the schema model table which keeps the schema
+    registry of every process current. Add it to the migration creating the
+    schema model, after the ``CreateModel`` operation.
+    """
+
+    reduces_to_sql = True
+    reversible = True
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(settings.POSTGRES_SCHEMA_MODEL)
+        for statement in notify_trigger_sql(model, schema_editor.quote_name):
+            schema_editor.execute(statement, params=None)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(settings.POSTGRES_SCHEMA_MODEL)
+        for statement in drop_notify_trigger_sql(model, schema_editor.quote_name):
+            schema_editor.execute(statement, params=None)
+
+    def describe(self):
+        return 'Install schema registry notify trigger'
@@ -0,0 +1,212 @@
+import gzip
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, models, transaction
+from django.db.utils import OperationalError
+from django.utils import timezone
+
+from .models import get_schema_model
+from .schema import check_pooled_tables, get_pooled_tables
+
+
+def purgeable_schemas(retention_days=None):
+    """
+    Returns the inactive schemas deactivated longer than the retention period ago.
+    """
+    if retention_days is None:
+        retention_days = settings.POSTGRES_SCHEMA_RETENTION_DAYS
+    return get_schema_model().objects.inactive().filter(
+        deactivated_at__lte=timezone.now() - timedelta(days=retention_days)
+    )
+
+
+def backfill_deactivated_at():
+    """
+    Starts the retention period now for schemas deactivated before the
+    deactivation time was recorded.
+    """
+    return get_schema_model().objects.inactive().filter(
+        deactivated_at__isnull=True
+    ).update(deactivated_at=timezone.now())
+
+
+def get_schema_tables(schema_name):
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname
+            FROM pg_catalog.pg_class c
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = %s AND c.relkind IN ('r', 'p')
+            ORDER BY c.relname
+        """, [schema_name])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_replication_lag():
+    """
+    Returns the number of WAL bytes the slowest standby has yet to replay.
+    """
+    with connection.cursor() as cursor:
+        if connection.pg_version >= 100000:
+            cursor.execute(
+                "SELECT max(pg_wal_lsn_diff(pg_current_wal_lsn(), replay_lsn)) FROM pg_stat_replication"
+            )
+        else:
+            cursor.execute(
+                "SELECT max(pg_xlog_location_diff(pg_current_xlog_location(), replay_location)) "
+                "FROM pg_stat_replication"
+            )
+        return cursor.fetchone()[0] or 0
+
+
+class SchemaPurge:
+    """
+    Drops inactive schemas a few tables at a time.
+
+    Every batch of tables is dropped in its own short transaction, so catalog
+    locks are held briefly and WAL is written gradually. Before each batch
+    the purge waits for standbys to catch up to ``max_lag`` bytes and it
+    stops once ``time_budget`` seconds have passed; schemas which were not
+    completely dropped are continued by the next run. Schemas reactivated
+    meanwhile, or whose tables stay locked longer than ``lock_timeout``, are
+    skipped. When ``archive_dir`` is given every table is first copied to a
+    gzipped CSV file in it. The rows of a pooled tenant are deleted from all
+    pooled tables in a single batch.
+    """
+
+    def __init__(self, batch_size=10, max_lag=None, time_budget=None,
+                 archive_dir=None, lock_timeout='5s', stdout=None):
+        self.batch_size = batch_size
+        self.max_lag = max_lag
+        self.time_budget = time_budget
+        self.archive_dir = archive_dir
+        self.lock_timeout = lock_timeout
+        self.stdout = stdout
+        self.started = None
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message + '\n')
+
+    def out_of_time(self):
+        return self.time_budget is not None and time.time() - self.started >= self.time_budget
+
+    def wait_for_replication(self):
+        if self.max_lag is None:
+            return True
+        while get_replication_lag() > self.max_lag:
+            if self.out_of_time():
+                return False
+            time.sleep(1)
+        return True
+
+    def run(self, schemas):
+        """
+        Purges the given schemas, returning the names of those completely dropped.
+        """
+        self.started = time.time()
+        purged = []
+        for schema in schemas:
+            if self.out_of_time():
+                break
+            result = self.purge(schema)
+            if result is False:
+                break
+            if result:
+                purged.append(schema.schema)
+        return purged
+
+    def is_inactive(self, schema, lock=False):
+        queryset = type(schema).objects.filter(pk=schema.pk, is_active=False)
+        if lock:
+            queryset = queryset.select_for_update()
+        return bool(list(queryset.values_list('pk', flat=True)))
+
+    def purge(self, schema):
+        """
+        Purges a schema. Returns ``True`` once it is gone, ``False`` when the
+        time budget ran out and ``None`` when it was skipped, because it was
+        reactivated or its tables could not be locked in time.
+        """
+        quote_name = connection.ops.quote_name
+        if schema.is_pooled:
+            try:
+                check_pooled_tables()
+            except ImproperlyConfigured as e:
+                self.log('Skipped %s, %s' % (schema.schema, e))
+                return None
+            tables = get_pooled_tables()
+        else:
+            tables = get_schema_tables(schema.schema)
+        self.log('Purging %s (%d tables)' % (schema.schema, len(tables)))
+
+        batch_size = self.batch_size
+        if schema.is_pooled:
+            # Foreign keys between the pooled tables are only checked on commit,
+            # so the rows of a pooled tenant are all deleted in one transaction.
+            batch_size = max(len(tables), 1)
+
+        try:
+            for start in range(0, len(tables), batch_size):
+                if self.out_of_time() or not self.wait_for_replication():
+                    self.log('  Time budget exhausted, %d tables left' % (len(tables) - start))
+                    return False
+                if not self.is_inactive(schema):
+                    self.log('  Skipped, %s has been reactivated' % schema.schema)
+                    return None
+                batch = tables[start:start + batch_size]
+
+                # Archiving happens before the drop transaction, so that no
+                # catalog locks are held while tables are copied.
+                if self.archive_dir:
+                    for table in batch:
+                        self.archive(schema, table)
+
+                with transaction.atomic():
+                    # Reactivating the schema waits for this batch to finish.
+                    if not self.is_inactive(schema, lock=True):
+                        self.log('  Skipped, %s has been reactivated' % schema.schema)
+                        return None
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET LOCAL lock_timeout TO %s", [self.lock_timeout])
+                        for table in batch:
+                            qualified = '%s.%s' % (quote_name(schema.schema_name), quote_name(table))
+                            if schema.is_pooled:
+                                # Other tenants share the table, only the rows of this one go.
+                                cursor.execute('DELETE FROM %s WHERE tenant = %%s' % qualified, [schema.schema])
+                            else:
+                                cursor.execute('DROP TABLE IF EXISTS %s CASCADE' % qualified)
+                self.log('  Purged %s' % ', '.join(batch))
+
+            with transaction.atomic():
+                if not self.is_inactive(schema, lock=True):
+                    self.log('  Skipped, %s has been reactivated' % schema.schema)
+                    return None
+                if not schema.is_pooled:
+                    # Only sequences, views and functions are left, which are cheap to drop.
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET LOCAL lock_timeout TO %s", [self.lock_timeout])
+                        cursor.execute('DROP SCHEMA IF EXISTS %s CASCADE' % quote_name(schema.schema))
+                # The schema queryset only deactivates, the row is really deleted here.
+                models.QuerySet.delete(type(schema).objects.filter(pk=schema.pk))
+        except OperationalError as e:
+            self.log('  Skipped, %s' % e)
+            return None
+
+        self.log('  Purged schema %s' % schema.schema)
+        return True
+
+    def archive(self, schema, table):
+        quote_name = connection.ops.quote_name
+        source = '%s.%s' % (quote_name(schema.schema_name), quote_name(table))
+        with connection.cursor() as cursor:
+            if schema.is_pooled:
+                source = cursor.mogrify('(SELECT * FROM %s WHERE tenant = %%s)' % source, [schema.schema]).decode()
+            directory = os.path.join(self.archive_dir, schema.schema)
+            os.makedirs(directory, exist_ok=True)
+            with gzip.open(os.path.join(directory, table + '.csv.gz'), 'wb') as fp:
+                cursor.copy_expert('COPY %s TO STDOUT WITH CSV HEADER' % source, fp)
@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+
+logger = logging.getLogger('postgres_schema.registry')
+
+with open(os.path.join(os.path.dirname(__file__), 'sql', 'notify_schema_change.001.sql')) as fp:
+    NOTIFY_SCHEMA_CHANGE = fp.read()
+
+
+def notify_trigger_sql(model, quote_name):
+    """
+    Returns the statements installing the trigger that announces changes to
+    the schema model table on the registry channel.
+    """
+    table = quote_name(model._meta.db_table)
+    return [
+        NOTIFY_SCHEMA_CHANGE,
+        "DROP TRIGGER IF EXISTS notify_schema_change ON {}".format(table),
+        "CREATE TRIGGER notify_schema_change AFTER INSERT OR UPDATE OR DELETE ON {} "
+        "FOR EACH ROW EXECUTE PROCEDURE notify_schema_change('{}')".format(
+            table, settings.POSTGRES_SCHEMA_REGISTRY_CHANNEL
+        ),
+    ]
+
+
+def drop_notify_trigger_sql(model, quote_name):
+    return [
+        "DROP TRIGGER IF EXISTS notify_schema_change ON {}".format(quote_name(model._meta.db_table)),
+        "DROP FUNCTION IF EXISTS notify_schema_change()",
+    ]
+
+
+class SchemaRegistry:
+    """
+    Process-wide copy of the schema model table and of the schema names in
+    ``pg_namespace``.
+
+    The registry is loaded on first use and then kept current by a daemon
+    thread which listens for the notifications sent by the
+    ``notify_schema_change`` trigger. The same thread reloads the whole
+    registry every ``POSTGRES_SCHEMA_REGISTRY_POLL_INTERVAL`` seconds, which
+    is the only source of updates when ``LISTEN`` is not available, and the
+    only way schemas created outside of the schema model are noticed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.listening = threading.Event()
+        self._thread = None
+        self._rows = None
+        self._namespaces = set()
+        self._pid = None
+
+    @property
+    def enabled(self):
+        return settings.POSTGRES_SCHEMA_REGISTRY
+
+    @property
+    def rows(self):
+        # A forked child has no listener thread, so it loads its own copy.
+        if self._rows is None or self._pid != os.getpid():
+            with self._lock:
+                if self._rows is None or self._pid != os.getpid():
+                    self.reload()
+                    self.start()
+        return self._rows
+
+    def exists(self, schema_name):
+        return schema_name in self.rows or schema_name in self._namespaces
+
+    def is_active(self, schema_name):
+        row = self.rows.get(schema_name)
+        return row is not None and row['is_active']
+
+    def active(self):
+        return sorted(name for name, row in self.rows.items() if row['is_active'])
+
+    def get(self, schema_name):
+        """
+        Returns an instance of the schema model for ``schema_name`` built
+        from the registry, or ``None`` when there is no such schema.
+        """
+        from .models import get_schema_model
+        row = self.rows.get(schema_name)
+        if row is None:
+            return None
+        model = get_schema_model()
+        fields = model._meta.concrete_fields
+        return model.from_db(
+            None, [field.attname for field in fields], [field.to_python(row[field.column]) for field in fields]
+        )
+
+    def set(self, schema):
+        if self._rows is not None:
+            self._rows[schema.schema] = {
+                field.column: getattr(schema, field.attname) for field in schema._meta.concrete_fields
+            }
+            self._namespaces.add(schema.schema_name)
+
+    def discard(self, schema_name):
+        if self._rows is not None:
+            self._rows.pop(schema_name, None)
+
+    def reload(self, cursor=None):
+        from .models import get_schema_model
+        if cursor is None:
+            with connection.cursor() as cursor:
+                return self.reload(cursor)
+        cursor.execute('SELECT * FROM {}'.format(
+            connection.ops.quote_name(get_schema_model()._meta.db_table)
+        ))
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        cursor.execute('SELECT nspname FROM pg_catalog.pg_namespace')
+        self._namespaces = {row[0] for row in cursor.fetchall()}
+        self._rows = {row['schema']: row for row in rows}
+        self._pid = os.getpid()
+
+    def notify(self, payload):
+        """
+        Applies a notification sent by the ``notify_schema_change`` trigger.
+        """
+        change = json.loads(payload)
+        if change['op'] == 'DELETE':
+            self.discard(change['schema'])
+        elif self._rows is not None:
+            self._rows[change['schema']] = change['row']
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='postgres_schema.registry')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the listener thread and closes its connection.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception('Schema registry listener failed, reconnecting.')
+            self._stopped.wait(settings.POSTGRES_SCHEMA_REGISTRY_POLL_INTERVAL)
+
+    def _listen(self):
+        interval = settings.POSTGRES_SCHEMA_REGISTRY_POLL_INTERVAL
+        # The listener needs a dedicated autocommit connection, outside of
+        # Django's connection handling, so that notifications are delivered.
+        conn = connection.get_new_connection(connection.get_connection_params())
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                try:
+                    cursor.execute('LISTEN {}'.format(settings.POSTGRES_SCHEMA_REGISTRY_CHANNEL))
+                    listening = True
+                except Exception:
+                    logger.warning('LISTEN is not available, polling for schema changes instead.')
+                    listening = False
+                # Reload after LISTEN so that no change is missed in between.
+                self.reload(cursor)
+                if listening:
+                    self.listening.set()
+                last_reload = time.monotonic()
+                while not self._stopped.is_set():
+                    if listening and select.select([conn], [], [], min(interval, 1)) != ([], [], []):
+                        conn.poll()
+                        while conn.notifies:
+                            self.notify(conn.notifies.pop(0).payload)
+                    elif not listening:
+                        self._stopped.wait(min(interval, 1))
+                    if time.monotonic() - last_reload >= interval:
+                        self.reload(cursor)
+                        last_reload = time.monotonic()
+        finally:
+            self.listening.clear()
+            conn.close()
+
+
+schema_registry = SchemaRegistry()
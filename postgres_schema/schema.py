@@ -1,6 +1,9 @@
 import sys
+from collections import OrderedDict
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.db import connection
+from django.db.utils import OperationalError
 from django.db.backends.postgresql.schema import DatabaseSchemaEditor as PostgreSQLSchemaEditor
 
 
@@ -25,14 +28,73 @@ def schema_exists(schema_name):
         return bool(cursor.fetchone())
 
 
-def activate_schema(schema_name, exclude_public=False):
+class ConcurrencyLimitExceeded(OperationalError):
+    pass
+
+
+def activate_schema(schema_name, exclude_public=False, parameters=None, concurrency=None, tenant=None):
+    """
+    Activates a schema on the connection with a single round-trip.
+
+    ``parameters`` are run-time settings such as ``statement_timeout`` set
+    along with the search_path; settings applied by a previous activation
+    and not given again are reset to their defaults. ``concurrency`` caps
+    the number of connections which may have the tenant active at the same
+    time, using session level advisory locks as a semaphore.
+
+    ``tenant`` identifies the tenant when it does not have a schema of its
+    own, it defaults to the schema name.
+    """
+    tenant = tenant or schema_name
+    statements, params = [], []
+
+    # Release the semaphore slot held for the previously active schema.
+    slot = getattr(connection, 'schema_slot', None)
+    if slot is not None:
+        statements.append("SELECT pg_advisory_unlock(hashtext(%s), %s)")
+        params.extend(slot)
+
+    if schema_name == settings.POSTGRES_PUBLIC_SCHEMA or exclude_public:
+        statements.append("SET search_path TO %s")
+        params.append(schema_name)
+    else:
+        statements.append("SET search_path TO %s, %s")
+        params.extend([schema_name, settings.POSTGRES_PUBLIC_SCHEMA])
+
+    if settings.POSTGRES_SCHEMA_APPLICATION_NAME:
+        # Tagging the connection in the same round-trip attributes its queries
+        # to the tenant in pg_stat_activity and in logs (%a in log_line_prefix).
+        statements.append("SET application_name TO %s")
+        params.append(settings.POSTGRES_SCHEMA_APPLICATION_NAME.format(schema=tenant)[:63])
+
+    parameters = {name: value for name, value in (parameters or {}).items() if value is not None}
+    for name in sorted(parameters):
+        statements.append("SET {} TO %s".format(name))
+        params.append(parameters[name])
+    for name in sorted(getattr(connection, 'schema_parameters', set()) - set(parameters)):
+        statements.append("SET {} TO DEFAULT".format(name))
+
+    if concurrency:
+        statements.append(
+            "SELECT slot FROM generate_series(0, %s) AS slot "
+            "WHERE pg_try_advisory_lock(hashtext(%s), slot) LIMIT 1"
+        )
+        params.extend([concurrency - 1, tenant])
+
     with connection.cursor() as cursor:
-        if schema_name == settings.POSTGRES_PUBLIC_SCHEMA or exclude_public:
-            cursor.execute("SET search_path TO %s", (schema_name,))
-        else:
-            cursor.execute("SET search_path TO %s, %s", (
-                schema_name, settings.POSTGRES_PUBLIC_SCHEMA,
-            ))
+        cursor.execute('; '.join(statements), params)
+        acquired = cursor.fetchone() if concurrency else None
+
+    connection.schema_name = schema_name
+    connection.tenant_name = tenant
+    connection.schema_parameters = set(parameters)
+    connection.schema_slot = (tenant, acquired[0]) if acquired else None
+
+    if concurrency and not acquired:
+        deactivate_schema()
+        raise ConcurrencyLimitExceeded(
+            'Schema %s is already in use by %d connections.' % (tenant, concurrency)
+        )
 
 
 def deactivate_schema():
@@ -45,6 +107,176 @@ def get_active_schema_name():
         return cursor.fetchone()
 
 
+def get_pooled_tables():
+    """
+    Returns the tables of the pooled schema which have a tenant column.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT table_name FROM information_schema.columns
+            WHERE table_schema = %s AND column_name = 'tenant'
+            ORDER BY table_name
+        """, [settings.POSTGRES_POOLED_SCHEMA])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_unsplittable_tables():
+    """
+    Returns the tables of the pooled schema, and of the template it is cloned
+    from, which have no tenant column. Their rows can not be told apart by
+    tenant, so every pooled tenant would see all of them.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT DISTINCT c.relname
+            FROM pg_catalog.pg_class c
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname IN (%s, %s) AND c.relkind IN ('r', 'p')
+              AND NOT EXISTS (
+                SELECT 1 FROM pg_catalog.pg_attribute a
+                WHERE a.attrelid = c.oid AND a.attname = 'tenant' AND NOT a.attisdropped
+              )
+            ORDER BY c.relname
+        """, [settings.POSTGRES_POOLED_SCHEMA, settings.POSTGRES_TEMPLATE_SCHEMA])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def check_pooled_tables():
+    """
+    Raises ``ImproperlyConfigured`` unless every pooled table has a tenant column.
+    """
+    unsplittable = get_unsplittable_tables()
+    if unsplittable:
+        raise ImproperlyConfigured(
+            'Pooled tables %s have no tenant column, tenant models must derive '
+            'from PooledTenantModel.' % ', '.join(unsplittable)
+        )
+
+
+def move_pooled_rows(tenant):
+    """
+    Moves the rows of a pooled tenant into its own schema, which must have
+    been cloned from the template already. Must be called in a transaction.
+
+    Writes to the pooled tables wait until the transaction ends, so no row
+    written by the tenant meanwhile is left behind. Processes still holding
+    the tenant as pooled must resolve it again to write to its own schema.
+    """
+    check_pooled_tables()
+    quote_name = connection.ops.quote_name
+    pooled = quote_name(settings.POSTGRES_POOLED_SCHEMA)
+    dedicated = quote_name(tenant)
+    tables = get_pooled_tables()
+    with connection.cursor() as cursor:
+        if tables:
+            cursor.execute('LOCK TABLE {} IN SHARE ROW EXCLUSIVE MODE'.format(', '.join(
+                '%s.%s' % (pooled, quote_name(table)) for table in tables
+            )))
+        # Foreign keys are checked once all rows have been moved.
+        cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+        for table in tables:
+            cursor.execute("""
+                SELECT column_name FROM information_schema.columns
+                WHERE table_schema = %s AND table_name = %s
+                ORDER BY ordinal_position
+            """, [settings.POSTGRES_POOLED_SCHEMA, table])
+            columns = ', '.join(quote_name(row[0]) for row in cursor.fetchall())
+            names = {'pooled': pooled, 'dedicated': dedicated, 'table': quote_name(table), 'columns': columns}
+            # Deleting and inserting in one statement moves exactly the same rows.
+            cursor.execute(
+                'WITH moved AS (DELETE FROM {pooled}.{table} WHERE tenant = %s RETURNING {columns}) '
+                'INSERT INTO {dedicated}.{table} ({columns}) SELECT {columns} FROM moved'.format(**names),
+                [tenant]
+            )
+
+        # Moved rows keep their ids, so the sequences continue after them.
+        cursor.execute("""
+            SELECT table_name, column_name,
+                   substring(column_default from 'nextval\\(''(.*)''::regclass\\)')
+            FROM information_schema.columns
+            WHERE table_schema = %s AND column_default LIKE 'nextval(%%'
+        """, [tenant])
+        for table, column, sequence in cursor.fetchall():
+            cursor.execute('SELECT setval(%s::regclass, coalesce(max({column}), 1), max({column}) IS NOT NULL) '
+                           'FROM {dedicated}.{table}'.format(
+                               column=quote_name(column), dedicated=dedicated, table=quote_name(table),
+                           ), [sequence])
+
+
+# Describes the tables, columns, constraints, indexes and triggers of the given
+# schemas, one line per object, with references to the schema itself removed
+# so that the structure of different schemas can be compared.
+SCHEMA_STRUCTURE_SQL = r"""
+    WITH namespaces AS (
+        SELECT oid, nspname FROM pg_catalog.pg_namespace WHERE nspname = ANY(%s)
+    ), items AS (
+        SELECT n.nspname, 'relation ' || c.relname || ' ' || c.relkind AS item
+        FROM pg_catalog.pg_class c
+        JOIN namespaces n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f', 'S')
+      UNION ALL
+        SELECT n.nspname, 'column ' || c.relname || ' ' || a.attname || ' '
+            || pg_catalog.format_type(a.atttypid, a.atttypmod)
+            || CASE WHEN a.attnotnull THEN ' NOT NULL' ELSE '' END
+            || coalesce(' DEFAULT ' || pg_catalog.pg_get_expr(d.adbin, d.adrelid), '')
+        FROM pg_catalog.pg_attribute a
+        JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+        JOIN namespaces n ON n.oid = c.relnamespace
+        LEFT JOIN pg_catalog.pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+        WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f') AND a.attnum > 0 AND NOT a.attisdropped
+      UNION ALL
+        SELECT n.nspname, 'constraint ' || c.relname || ' ' || co.conname || ' '
+            || pg_catalog.pg_get_constraintdef(co.oid)
+        FROM pg_catalog.pg_constraint co
+        JOIN pg_catalog.pg_class c ON c.oid = co.conrelid
+        JOIN namespaces n ON n.oid = co.connamespace
+      UNION ALL
+        SELECT n.nspname, 'index ' || pg_catalog.pg_get_indexdef(i.indexrelid)
+        FROM pg_catalog.pg_index i
+        JOIN pg_catalog.pg_class c ON c.oid = i.indrelid
+        JOIN namespaces n ON n.oid = c.relnamespace
+      UNION ALL
+        SELECT n.nspname, 'trigger ' || pg_catalog.pg_get_triggerdef(t.oid)
+        FROM pg_catalog.pg_trigger t
+        JOIN pg_catalog.pg_class c ON c.oid = t.tgrelid
+        JOIN namespaces n ON n.oid = c.relnamespace
+        WHERE NOT t.tgisinternal
+    ), normalized AS (
+        SELECT nspname, regexp_replace(
+            item, '"?\m' || nspname || '"?\.', '', 'g'
+        ) AS item
+        FROM items
+    )
+"""
+
+
+def get_schema_fingerprints(schema_names):
+    """
+    Returns a fingerprint of the structure of each of the given schemas,
+    computed in a single query. Schemas with the same structure have the same
+    fingerprint, schemas without any tables are left out.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(SCHEMA_STRUCTURE_SQL + """
+            SELECT nspname, md5(string_agg(item, E'\\n' ORDER BY item))
+            FROM normalized
+            GROUP BY nspname
+        """, [list(schema_names)])
+        return dict(cursor.fetchall())
+
+
+def get_schema_structure(schema_name):
+    """
+    Returns the sorted lines describing the structure of a schema, which are
+    what its fingerprint is computed from.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(SCHEMA_STRUCTURE_SQL + """
+            SELECT item FROM normalized ORDER BY item
+        """, [[schema_name]])
+        return [row[0] for row in cursor.fetchall()]
+
+
 def wrap(name):
 
     def _apply_to_all(self, model, *args, **kwargs):
@@ -74,7 +306,7 @@ def wrap(name):
             return result
 
         schema_names = [settings.POSTGRES_TEMPLATE_SCHEMA]
-        schema_names.extend(get_schema_model().objects.values_list('schema', flat=True))
+        schema_names.extend(get_schema_model().objects.schema_names())
         result = None
         for schema in schema_names:
             self.activate_schema(schema)
@@ -109,27 +341,43 @@ class DatabaseSchemaEditor(PostgreSQLSchemaEditor):
 
     def __enter__(self):
         super().__enter__()
-        self.schema_deferred_sql = {}
+        self.schema_deferred_sql = OrderedDict()
         self.activate_schema(settings.POSTGRES_PUBLIC_SCHEMA)
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self.deferred_sql = self.schema_deferred_sql.pop(settings.POSTGRES_PUBLIC_SCHEMA, [])
         if exc_type is None:
+            # Tenant tables may reference public tables, so public deferred SQL
+            # runs first, followed by the template and then each tenant schema.
+            public_sql = self.schema_deferred_sql.pop(settings.POSTGRES_PUBLIC_SCHEMA, [])
+            self.run_deferred_sql(settings.POSTGRES_PUBLIC_SCHEMA, public_sql)
             for schema_name, sql in self.schema_deferred_sql.items():
-                activate_schema(schema_name)
-                for statement in sql:
-                    self.execute(statement)
+                self.run_deferred_sql(schema_name, sql)
             deactivate_schema()
+        self.deferred_sql = []
         super().__exit__(exc_type, exc_value, traceback)
 
+    def run_deferred_sql(self, schema_name, statements):
+        """
+        Executes the deferred statements of a schema, skipping duplicates.
+        """
+        if not statements:
+            return
+        activate_schema(schema_name)
+        seen = set()
+        for statement in statements:
+            sql = str(statement)
+            if sql not in seen:
+                seen.add(sql)
+                self.execute(sql)
+
     def activate_schema(self, schema):
         if isinstance(schema, str):
             self.schema = None
             self.schema_name = schema
         else:
             self.schema = schema
-            self.schema_name = schema.schema
+            self.schema_name = schema.schema_name
         activate_schema(self.schema_name)
         self.deferred_sql = self.schema_deferred_sql.setdefault(self.schema_name, [])
 
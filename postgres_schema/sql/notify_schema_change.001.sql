@@ -0,0 +1,22 @@
+CREATE OR REPLACE FUNCTION notify_schema_change() RETURNS trigger AS $$
+
+DECLARE
+  row_  record;
+
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    row_ := OLD;
+  ELSE
+    row_ := NEW;
+  END IF;
+
+  PERFORM pg_notify(TG_ARGV[0], json_build_object(
+    'op',     TG_OP,
+    'schema', row_.schema,
+    'row',    row_to_json(row_)
+  )::text);
+
+  RETURN NULL;
+END;
+
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,122 @@
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test.runner import DiscoverRunner
+
+from .models import get_schema_model
+
+
+class SchemaTestRunner(DiscoverRunner):
+    """
+    Test runner creating the fixture tenants of ``POSTGRES_SCHEMA_TEST_TENANTS``
+    once, in the test database, before it is copied for parallel workers.
+
+    The copies of every test database are made with ``CREATE DATABASE ...
+    TEMPLATE``, so each worker starts with the template schema and all fixture
+    tenants already cloned. The tenants are created in the default database.
+    A ``TransactionTestCase`` flushes their rows, ``TenantTablesMixin``
+    restores them.
+    """
+
+    def setup_databases(self, **kwargs):
+        parallel, self.parallel = self.parallel, 0
+        try:
+            old_config = super().setup_databases(**kwargs)
+        finally:
+            self.parallel = parallel
+        self.create_tenants()
+        if self.parallel > 1:
+            # Mirrors are not destroyed, nor cloned.
+            for conn, old_name, destroy in old_config:
+                if destroy and conn.features.can_clone_databases:
+                    for index in range(self.parallel):
+                        conn.creation.clone_test_db(
+                            str(index + 1), verbosity=self.verbosity, keepdb=self.keepdb,
+                        )
+        return old_config
+
+    def create_tenants(self):
+        create_test_tenants()
+
+
+def create_test_tenants():
+    """
+    Creates the fixture tenants of ``POSTGRES_SCHEMA_TEST_TENANTS`` which are
+    missing.
+
+    Tenants whose schema is still there, kept with --keepdb or flushed from
+    the schema model table by a ``TransactionTestCase``, only get their row
+    back.
+    """
+    if not settings.POSTGRES_SCHEMA_TEST_TENANTS:
+        return
+    Schema = get_schema_model()
+    existing = set(Schema.objects.values_list('schema', flat=True))
+    for tenant in settings.POSTGRES_SCHEMA_TEST_TENANTS:
+        fields = tenant if isinstance(tenant, dict) else {'schema': tenant, 'name': tenant}
+        if fields['schema'] in existing:
+            continue
+        schema = Schema(**fields)
+        if schema.is_pooled or not schema.schema_exists():
+            schema.save()
+        else:
+            # Saving would refuse the schema as already in use.
+            Schema.objects.bulk_create([schema])
+
+
+WRITE_STATEMENT = re.compile(
+    r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|COPY)\s+(?:"?(\w+)"?\.)?"?(\w+)"?',
+    re.IGNORECASE,
+)
+
+
+class TenantTablesMixin:
+    """
+    Mixin for ``TransactionTestCase`` truncating the tenant tables written to
+    by a test, instead of every table of every tenant.
+
+    Public tables are flushed by ``TransactionTestCase`` as usual, after which
+    the fixture tenants of ``POSTGRES_SCHEMA_TEST_TENANTS`` are restored.
+    """
+
+    def _pre_setup(self):
+        if not hasattr(connection, 'execute_wrappers'):
+            raise ImproperlyConfigured('TenantTablesMixin requires Django 2.0 or later.')
+        super()._pre_setup()
+        self._touched_tables = set()
+        connection.execute_wrappers.append(self._track_writes)
+
+    def _track_writes(self, execute, sql, params, many, context):
+        match = WRITE_STATEMENT.match(sql)
+        if match:
+            schema_name = match.group(1) or getattr(context['connection'], 'schema_name', None)
+            if schema_name and schema_name != settings.POSTGRES_PUBLIC_SCHEMA:
+                self._touched_tables.add((schema_name, match.group(2)))
+        return execute(sql, params, many, context)
+
+    def truncate_tenant_tables(self):
+        """
+        Truncates the tenant tables written to since the last truncation.
+        """
+        if not self._touched_tables:
+            return
+        quote_name = connection.ops.quote_name
+        tables = [
+            '%s.%s' % (quote_name(schema_name), quote_name(table))
+            for schema_name, table in sorted(self._touched_tables)
+        ]
+        self._touched_tables = set()
+        with connection.cursor() as cursor:
+            # Tables may have been dropped by the test itself.
+            cursor.execute("SELECT t FROM unnest(%s::text[]) AS t WHERE to_regclass(t) IS NOT NULL", [tables])
+            tables = [row[0] for row in cursor.fetchall()]
+            if tables:
+                cursor.execute('TRUNCATE {} RESTART IDENTITY CASCADE'.format(', '.join(tables)))
+
+    def _fixture_teardown(self):
+        connection.execute_wrappers.remove(self._track_writes)
+        self.truncate_tenant_tables()
+        super()._fixture_teardown()
+        create_test_tenants()
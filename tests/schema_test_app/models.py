@@ -1,5 +1,11 @@
-from postgres_schema.models import AbstractSchema
+from django.db import models
+
+from postgres_schema.models import AbstractSchema, PooledTenantModel
 
 
 class Company(AbstractSchema):
     pass
+
+
+class Note(PooledTenantModel):
+    text = models.TextField()
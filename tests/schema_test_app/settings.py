@@ -13,3 +13,4 @@ DATABASES = {
 }
 POSTGRES_SCHEMA_MODEL = 'schema_test_app.Company'
 SECRET_KEY = 'test-key'
+TEST_RUNNER = 'postgres_schema.testing.SchemaTestRunner'
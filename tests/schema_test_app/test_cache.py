@@ -0,0 +1,41 @@
+from django.test import TestCase, override_settings
+
+from postgres_schema.cache import TenantCache
+from .models import Company
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TenantCacheTests(TestCase):
+
+    def setUp(self):
+        self.good = Company.objects.create(schema='good', name='good')
+        self.bad = Company.objects.create(schema='bad', name='bad')
+        self.cache = TenantCache()
+
+    def tearDown(self):
+        Company.deactivate()
+
+    def test_keys_are_tenant_scoped(self):
+        self.good.activate()
+        self.cache.set('color', 'green')
+        self.bad.activate()
+        self.assertIsNone(self.cache.get('color'))
+        self.cache.set('color', 'red')
+        self.good.activate()
+        self.assertEqual(self.cache.get('color'), 'green')
+
+    def test_invalidate(self):
+        self.good.activate()
+        self.cache.set('color', 'green')
+        self.bad.activate()
+        self.cache.set('color', 'red')
+        self.cache.invalidate('good')
+        self.assertEqual(self.cache.get('color'), 'red')
+        self.good.activate()
+        self.assertIsNone(self.cache.get('color'))
+
+    def test_stats(self):
+        self.good.activate()
+        self.assertEqual(self.cache.get_or_set('count', lambda: 1), 1)
+        self.assertEqual(self.cache.get_or_set('count', lambda: 2), 1)
+        self.assertEqual(self.cache.stats(), {'good': {'hits': 1, 'misses': 1}})
@@ -0,0 +1,72 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from postgres_schema.purge import SchemaPurge
+from postgres_schema.schema import schema_exists
+
+from .models import Company
+
+
+class CheckSchemasTests(TestCase):
+
+    def setUp(self):
+        Company.objects.create(schema='good', name='good')
+        Company.objects.create(schema='bad', name='bad')
+
+    def test_no_drift(self):
+        out = StringIO()
+        call_command('check_schemas', stdout=out)
+        self.assertIn('2 of 2 schemas match', out.getvalue())
+
+    def test_drift(self):
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE bad.extra (id integer NOT NULL)')
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, '1 schemas differ'):
+            call_command('check_schemas', stdout=out)
+        self.assertIn('bad differs', out.getvalue())
+        self.assertIn('+ column extra id integer NOT NULL', out.getvalue())
+        self.assertNotIn('good differs', out.getvalue())
+
+
+class PurgeSchemasTests(TestCase):
+
+    def setUp(self):
+        self.active = Company.objects.create(schema='active', name='active')
+        self.recent = Company.objects.create(schema='recent', name='recent')
+        self.expired = Company.objects.create(schema='expired', name='expired')
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE expired.one (id integer)')
+            cursor.execute('CREATE TABLE expired.two (id integer)')
+        self.recent.delete()
+        self.expired.delete()
+        Company.objects.filter(pk='expired').update(deactivated_at=timezone.now() - timedelta(days=60))
+
+    def test_deactivated_at(self):
+        self.assertIsNone(Company.objects.get(pk='active').deactivated_at)
+        self.assertIsNotNone(Company.objects.get(pk='recent').deactivated_at)
+
+    def test_purge(self):
+        call_command('purge_schemas', batch_size=1, stdout=StringIO())
+        self.assertFalse(schema_exists('expired'))
+        self.assertFalse(Company.objects.filter(pk='expired').exists())
+        self.assertTrue(schema_exists('recent'))
+        self.assertTrue(Company.objects.filter(pk='recent').exists())
+
+    def test_reactivated_schema_is_skipped(self):
+        expired = Company.objects.get(pk='expired')
+        Company.objects.filter(pk='expired').update(is_active=True)
+        self.assertEqual(SchemaPurge(batch_size=1).run([expired]), [])
+        self.assertTrue(schema_exists('expired'))
+        self.assertTrue(Company.objects.filter(pk='expired').exists())
+
+    def test_backfill(self):
+        Company.objects.filter(pk='recent').update(deactivated_at=None)
+        call_command('purge_schemas', stdout=StringIO())
+        self.assertIsNotNone(Company.objects.get(pk='recent').deactivated_at)
+        self.assertTrue(schema_exists('recent'))
@@ -0,0 +1,89 @@
+from unittest import skipUnless
+
+import django
+from django.core.signals import request_finished
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from postgres_schema.engine.stats import query_stats
+from postgres_schema.schema import ConcurrencyLimitExceeded
+from .models import Company
+
+
+class EngineTests(TestCase):
+
+    def setUp(self):
+        self.good = Company.objects.create(schema='good', name='good')
+
+    def tearDown(self):
+        Company.deactivate()
+
+    @override_settings(POSTGRES_SCHEMA_APPLICATION_NAME='tests:{schema}')
+    def test_application_name(self):
+        self.good.activate()
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW application_name')
+            self.assertEqual(cursor.fetchone()[0], 'tests:good')
+
+    @skipUnless(django.VERSION >= (2, 0), 'Execute wrappers require Django 2.0.')
+    @override_settings(POSTGRES_SCHEMA_QUERY_STATS=True)
+    def test_query_stats(self):
+        query_stats.reset()
+        self.good.activate()
+        Company.objects.count()
+        Company.objects.count()
+        queries = {schema_name: count for schema_name, count, seconds in query_stats.report()}
+        self.assertEqual(queries['good'], 2)
+
+
+class GovernanceTests(TestCase):
+
+    def tearDown(self):
+        Company.deactivate()
+
+    def show(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW {}'.format(name))
+            return cursor.fetchone()[0]
+
+    def advisory_locks(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()")
+            return cursor.fetchone()[0]
+
+    def test_parameters(self):
+        default = self.show('work_mem')
+        Company.objects.create(schema='good', name='good', statement_timeout=5000, work_mem='64MB').activate()
+        self.assertEqual(self.show('statement_timeout'), '5s')
+        self.assertEqual(self.show('work_mem'), '64MB')
+        Company.deactivate()
+        self.assertEqual(self.show('statement_timeout'), '0')
+        self.assertEqual(self.show('work_mem'), default)
+
+    def test_concurrency(self):
+        Company.objects.create(schema='good', name='good', max_concurrency=2).activate()
+        self.assertEqual(self.advisory_locks(), 1)
+        Company.deactivate()
+        self.assertEqual(self.advisory_locks(), 0)
+
+    def test_concurrency_limit(self):
+        good = Company.objects.create(schema='good', name='good', max_concurrency=1)
+        other = connection.get_new_connection(connection.get_connection_params())
+        try:
+            with other.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_lock(hashtext('good'), 0)")
+            Company.objects.create(schema='bad', name='bad').activate()
+            with self.assertRaises(ConcurrencyLimitExceeded):
+                good.activate()
+            self.assertIsNone(Company.active())
+            self.assertEqual(self.show('search_path'), 'public')
+        finally:
+            other.close()
+
+    def test_deactivated_when_request_finishes(self):
+        Company.objects.create(schema='good', name='good', max_concurrency=2, work_mem='64MB').activate()
+        request_finished.send(sender=self.__class__)
+        self.assertEqual(self.advisory_locks(), 0)
+        self.assertEqual(self.show('search_path'), 'public')
+        self.assertNotEqual(self.show('work_mem'), '64MB')
+        self.assertIsNone(Company.active())
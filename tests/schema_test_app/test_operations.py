@@ -59,3 +59,14 @@ class RunInSchemaTests(MigrationTestCase):
         self.assertFalse(Person.objects.exists())
         good.activate()
         self.assertTrue(Person.objects.exists())
+
+    def test_run_in_pooled_schema_without_pooled_tenants(self):
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE SCHEMA __pooled__')
+        self.migrate([
+            self.create_model,
+            RunInSchemas(self.run_sql)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM __pooled__.schema_test_app_person')
+            self.assertEqual(cursor.fetchone()[0], 1)
@@ -0,0 +1,105 @@
+from io import StringIO
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from postgres_schema.purge import SchemaPurge
+from postgres_schema.schema import schema_exists
+from .models import Company, Note
+
+
+class PooledTenantTests(TestCase):
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE __template__.item (id serial PRIMARY KEY, tenant varchar(36) NOT NULL)')
+        self.small = Company.objects.create(schema='small', name='small', is_pooled=True)
+        self.tiny = Company.objects.create(schema='tiny', name='tiny', is_pooled=True)
+
+    def tearDown(self):
+        Company.deactivate()
+
+    def items(self, schema_name):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tenant FROM {}.item ORDER BY id'.format(connection.ops.quote_name(schema_name)))
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_shared_schema(self):
+        self.assertTrue(schema_exists('__pooled__'))
+        self.assertFalse(schema_exists('small'))
+        self.assertEqual(Company.objects.schema_names(), ['__pooled__'])
+        self.small.activate()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT current_schema()')
+            self.assertEqual(cursor.fetchone()[0], '__pooled__')
+
+    def test_manager(self):
+        self.small.activate()
+        Note.objects.create(text='small')
+        self.tiny.activate()
+        Note.objects.create(text='tiny')
+        self.assertEqual([note.text for note in Note.objects.all()], ['tiny'])
+        Company.deactivate()
+        self.assertEqual(Note.objects.count(), 2)
+
+    def test_promote(self):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO __pooled__.item (tenant) VALUES ('small'), ('tiny'), ('small')")
+        call_command('promote_schema', 'small', stdout=StringIO())
+        self.assertFalse(Company.objects.get(pk='small').is_pooled)
+        self.assertEqual(self.items('__pooled__'), ['tiny'])
+        self.assertEqual(self.items('small'), ['small', 'small'])
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO small.item (tenant) VALUES ('small')")
+        self.assertEqual(Company.objects.schema_names(), ['small', '__pooled__'])
+
+    def test_promote_unsplittable(self):
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE __pooled__.item_tag (item_id integer REFERENCES __pooled__.item (id))')
+        with self.assertRaises(CommandError):
+            call_command('promote_schema', 'small', stdout=StringIO())
+        self.assertFalse(schema_exists('small'))
+
+    def test_plain_tenant_table(self):
+        # The table of a tenant model not derived from PooledTenantModel.
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE __template__.plain (id serial PRIMARY KEY)')
+            cursor.execute('CREATE TABLE __pooled__.plain (id serial PRIMARY KEY)')
+        with self.assertRaises(ImproperlyConfigured):
+            Company.objects.create(schema='other', name='other', is_pooled=True)
+        with self.assertRaises(CommandError):
+            call_command('promote_schema', 'small', stdout=StringIO())
+        self.small.delete()
+        self.assertEqual(SchemaPurge().run([Company.objects.get(pk='small')]), [])
+        self.assertTrue(Company.objects.filter(pk='small').exists())
+
+
+class PooledPurgeTests(TransactionTestCase):
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE __template__.item (id serial PRIMARY KEY, tenant varchar(36) NOT NULL)')
+            cursor.execute(
+                'CREATE TABLE __template__.part (id serial PRIMARY KEY, tenant varchar(36) NOT NULL, '
+                'item_id integer NOT NULL REFERENCES __template__.item (id) DEFERRABLE INITIALLY DEFERRED)'
+            )
+        self.small = Company.objects.create(schema='small', name='small', is_pooled=True)
+        Company.objects.create(schema='tiny', name='tiny', is_pooled=True)
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO __pooled__.item (tenant) VALUES ('small'), ('tiny')")
+            cursor.execute("INSERT INTO __pooled__.part (tenant, item_id) SELECT tenant, id FROM __pooled__.item")
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP SCHEMA __pooled__ CASCADE')
+            cursor.execute('DROP TABLE __template__.part, __template__.item')
+
+    def test_purge_related_tables(self):
+        self.small.delete()
+        purged = SchemaPurge(batch_size=1).run([Company.objects.get(pk='small')])
+        self.assertEqual(purged, ['small'])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tenant FROM __pooled__.part')
+            self.assertEqual(cursor.fetchall(), [('tiny',)])
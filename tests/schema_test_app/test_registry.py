@@ -0,0 +1,98 @@
+import json
+import time
+from unittest import mock
+
+from django.db import connection
+from django.forms import ValidationError
+from django.test import TestCase, TransactionTestCase
+
+from postgres_schema.registry import SchemaRegistry
+from .models import Company
+
+
+class SchemaRegistryTests(TestCase):
+
+    def setUp(self):
+        Company.objects.create(schema='good', name='good')
+        Company.objects.create(schema='bad', name='bad', is_active=False)
+        self.registry = SchemaRegistry()
+        self.registry.reload()
+
+    def tearDown(self):
+        Company.deactivate()
+
+    def test_reload(self):
+        self.assertTrue(self.registry.exists('good'))
+        self.assertTrue(self.registry.exists('bad'))
+        self.assertTrue(self.registry.exists('public'))
+        self.assertFalse(self.registry.exists('ugly'))
+        self.assertTrue(self.registry.is_active('good'))
+        self.assertFalse(self.registry.is_active('bad'))
+        self.assertEqual(self.registry.active(), ['good'])
+        self.assertEqual(self.registry.get('good').name, 'good')
+        self.assertIsNone(self.registry.get('ugly'))
+
+    def test_notify(self):
+        def payload(op, schema, is_active):
+            row = {'schema': schema, 'name': schema, 'is_active': is_active}
+            return json.dumps({'op': op, 'schema': schema, 'row': row})
+        self.registry.notify(payload('INSERT', 'ugly', True))
+        self.registry.notify(payload('UPDATE', 'good', False))
+        self.registry.notify(payload('DELETE', 'bad', False))
+        self.assertEqual(self.registry.active(), ['ugly'])
+        self.assertFalse(self.registry.exists('bad'))
+
+    def test_resolve_without_queries(self):
+        with self.settings(POSTGRES_SCHEMA_REGISTRY=True), \
+                mock.patch('postgres_schema.models.schema_registry', self.registry):
+            with self.assertNumQueries(0):
+                self.assertEqual(Company.objects.get_active('good').name, 'good')
+                with self.assertRaises(Company.DoesNotExist):
+                    Company.objects.get_active('bad')
+                self.assertTrue(Company(schema='bad').schema_exists())
+            with self.assertNumQueries(1):
+                Company.objects.activate('good')
+        self.assertEqual(Company.active().schema, 'good')
+
+    def test_filtered_queryset_can_not_resolve(self):
+        with self.assertRaises(AttributeError):
+            Company.objects.inactive().resolve('good')
+        with self.assertRaises(Company.DoesNotExist):
+            Company.objects.inactive().activate('good')
+
+    def test_schema_taken_while_registry_is_stale(self):
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE SCHEMA taken')
+        with self.settings(POSTGRES_SCHEMA_REGISTRY=True), \
+                mock.patch('postgres_schema.models.schema_registry', self.registry):
+            with self.assertRaises(ValidationError):
+                Company.objects.create(schema='taken', name='taken')
+
+
+class SchemaRegistryListenerTests(TransactionTestCase):
+
+    def setUp(self):
+        self.registry = SchemaRegistry()
+        self.registry.reload()
+        self.registry.start()
+        self.assertTrue(self.registry.listening.wait(5))
+
+    def tearDown(self):
+        self.registry.stop()
+        with connection.cursor() as cursor:
+            cursor.execute('DROP SCHEMA IF EXISTS good CASCADE')
+
+    def wait_for(self, condition):
+        for attempt in range(50):
+            if condition():
+                return
+            time.sleep(0.1)
+        self.fail('Registry was not notified.')
+
+    def test_notifications(self):
+        company = Company.objects.create(schema='good', name='good')
+        self.wait_for(lambda: self.registry.is_active('good'))
+        self.assertEqual(self.registry.get('good').name, 'good')
+        company.delete()
+        self.wait_for(lambda: not self.registry.is_active('good'))
+        self.assertIsNotNone(self.registry.get('good').deactivated_at)
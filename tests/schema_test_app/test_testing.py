@@ -0,0 +1,101 @@
+from unittest import mock, skipUnless
+
+import django
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.runner import DiscoverRunner
+
+from postgres_schema.schema import activate_schema, deactivate_schema, schema_exists
+from postgres_schema.testing import SchemaTestRunner, TenantTablesMixin, create_test_tenants
+from .models import Company
+
+
+@skipUnless(django.VERSION >= (2, 0), 'Execute wrappers require Django 2.0.')
+class TenantTablesMixinTests(TenantTablesMixin, TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE SCHEMA mixin')
+            cursor.execute('CREATE TABLE mixin.note (id serial PRIMARY KEY, text text)')
+            cursor.execute('CREATE TABLE mixin.untouched (id serial PRIMARY KEY)')
+            cursor.execute('INSERT INTO mixin.untouched DEFAULT VALUES')
+
+    @classmethod
+    def tearDownClass(cls):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP SCHEMA mixin CASCADE')
+        super().tearDownClass()
+
+    def count(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM mixin.{}'.format(table))
+            return cursor.fetchone()[0]
+
+    def test_truncates_touched_tables(self):
+        activate_schema('mixin')
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO note (text) VALUES ('hello')")
+        deactivate_schema()
+        self.assertEqual(self._touched_tables, {('mixin', 'note')})
+        self.truncate_tenant_tables()
+        self.assertEqual(self.count('note'), 0)
+        self.assertEqual(self.count('untouched'), 1)
+
+
+@skipUnless(django.VERSION >= (2, 0), 'Execute wrappers require Django 2.0.')
+@override_settings(POSTGRES_SCHEMA_TEST_TENANTS=['fixture'])
+class FixtureTenantsTests(TenantTablesMixin, TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        create_test_tenants()
+
+    @classmethod
+    def tearDownClass(cls):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP SCHEMA fixture CASCADE')
+        super().tearDownClass()
+
+    def tearDown(self):
+        Company.deactivate()
+
+    def test_1_flushes_public_tables(self):
+        Company.objects.filter(pk='fixture').update(name='renamed')
+
+    def test_2_fixture_tenant_survives(self):
+        self.assertEqual(Company.objects.get(pk='fixture').name, 'fixture')
+        Company.objects.get(pk='fixture').activate()
+
+
+class SchemaTestRunnerTests(TestCase):
+
+    def test_create_tenants(self):
+        tenants = ['fixture', {'schema': 'other', 'name': 'Other'}]
+        with self.settings(POSTGRES_SCHEMA_TEST_TENANTS=tenants):
+            runner = SchemaTestRunner(verbosity=0)
+            runner.create_tenants()
+            # Tenants kept with --keepdb are reused.
+            runner.create_tenants()
+        self.assertEqual(Company.objects.get(pk='other').name, 'Other')
+        self.assertTrue(schema_exists('fixture'))
+
+    def test_clones_after_creating_tenants(self):
+        calls = []
+        default, mirror = mock.Mock(), mock.Mock()
+        default.creation.clone_test_db.side_effect = lambda suffix, **kwargs: calls.append(('clone', suffix))
+
+        def setup_databases(runner, **kwargs):
+            calls.append(('setup', runner.parallel))
+            return [(default, 'test', True), (mirror, 'test', False)]
+
+        with mock.patch.object(DiscoverRunner, 'setup_databases', setup_databases), \
+                mock.patch.object(SchemaTestRunner, 'create_tenants', lambda runner: calls.append('tenants')):
+            runner = SchemaTestRunner(parallel=2, verbosity=0)
+            runner.setup_databases()
+
+        self.assertEqual(calls, [('setup', 0), 'tenants', ('clone', '1'), ('clone', '2')])
+        self.assertFalse(mirror.creation.clone_test_db.called)
+        self.assertEqual(runner.parallel, 2)